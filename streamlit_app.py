@@ -1,17 +1,266 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import aiohttp
 from urllib.parse import urljoin, urlparse
+from pybloom_live import ScalableBloomFilter
 import pandas as pd
 import re
+import html
+import codecs
+import functools
 import time
-from collections import deque
+import logging
+import importlib.util
+import threading
+from collections import Counter, OrderedDict, namedtuple
+
+# Brotli is optional: when either binding aiohttp supports (brotli or
+# brotlicffi) is installed, aiohttp transparently decodes "br" responses
+if importlib.util.find_spec('brotli') or importlib.util.find_spec('brotlicffi'):
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+else:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+logger = logging.getLogger(__name__)
 
 # --- Core Logic ---
 
 USER_AGENT = "WhatsAppLinkExtractor/1.0 (StreamlitApp; +https://github.com/yourusername/whatsapp-link-extractor)" # Be a good bot citizen
-REQUEST_DELAY = 1 # Seconds between requests to be polite
+RATE_LIMIT = 5 # Requests per second allowed to the crawled host, to be polite
+RATE_BURST = 10 # Requests that may be sent back-to-back before RATE_LIMIT applies
+MIN_RATE_LIMIT = 0.2 # Floor for RATE_LIMIT once the server asks us to slow down
+RATE_RECOVERY_STEP = 0.1 # Requests per second regained after each successful response
+RATE_LIMIT_BACKOFF = 2 # Base delay (seconds) for exponential backoff on HTTP 429
+MAX_CONCURRENCY = 20 # Maximum number of requests in flight at once
+CONNECT_TIMEOUT = 3 # Seconds to establish a connection; unreachable hosts fail fast
+READ_TIMEOUT = 10 # Seconds to wait for data on an established connection
+REQUEST_TIMEOUT = 20 # Overall cap (seconds) on one request, so a server trickling bytes cannot stall a level
+DEAD_HOST_THRESHOLD = 3 # Distinct URLs in a row that must fail to connect before a host is given up on
+MAX_PAGE_BYTES = 2 * 1024 * 1024 # Pages are truncated to this many bytes; larger declared sizes are skipped
+READ_CHUNK_SIZE = 64 * 1024 # Bytes read from the network at a time
+POOL_MAXSIZE = 32 # Keep-alive connections kept open to the crawled host
+MAX_RETRIES = 2 # Retries on connection errors and timeouts
+RETRY_BACKOFF = 0.3 # Base delay (seconds) for exponential backoff between retries
+URL_CACHE_SIZE = 200_000 # Entries kept by the memoized URL helpers
+URLJOIN_CACHE_SIZE = 50_000 # (origin, href) pairs kept by the memoized urljoin
+PAGE_CACHE_TTL = 3600 # Seconds a crawled page is reused without contacting the server
+PAGE_CACHE_MAX_ENTRIES = 10_000 # Crawled pages kept across reruns
+VISITED_BLOOM_CAPACITY = 10_000 # Initial capacity of the visited-URL Bloom filter (it grows as needed)
+VISITED_BLOOM_ERROR_RATE = 1e-5 # Chance that an unvisited URL is reported as visited
+VISITED_RECENT_SIZE = 1024 # Recently visited URLs also tracked exactly
+UI_UPDATE_INTERVAL = 0.2 # Minimum seconds between crawl status updates in the UI
+
+WHATSAPP_INVITE_PREFIX = "https://chat.whatsapp.com/"
+
+# Regex for https://chat.whatsapp.com/INVITE_CODE
+# Invite codes are typically alphanumeric, can include hyphens or underscores.
+# Let's be a bit generous with the character set for the invite code.
+_WA_RE = re.compile(rb"https?://chat\.whatsapp\.com/([A-Za-z0-9\-_]+)")
+# Link targets are pulled straight out of the raw page bytes; building a DOM
+# just to read href attributes is the most expensive part of handling a page.
+# Only <a> tags are followed, not <link>/<base>/etc. hrefs (stylesheets, feeds).
+# Earlier attributes are skipped whole, so a '>' inside a quoted value does not
+# end the tag; the href value itself may be double-, single- or un-quoted.
+# No match runs past the next '<', which keeps unbalanced quotes from turning
+# every <a> into a scan of the rest of the page.
+_HREF_RE = re.compile(
+    rb'<a\b(?:[^<>"\']|"[^"<]*"|\'[^\'<]*\')*?\shref\s*=\s*'
+    rb'(?:"([^"<]*)"|\'([^\'<]*)\'|([^\s"\'<>]+))',
+    re.I,
+)
+# Fragments and query-only links point back at the current page once cleaned;
+# the other schemes can never be crawled.
+_SKIPPED_HREF_PREFIXES = ('#', '?', 'mailto:', 'tel:', 'javascript:', 'data:')
+# Links to these files are never HTML, so they are not worth a request
+_SKIPPED_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico',
+    '.zip', '.rar', '.gz', '.mp3', '.mp4', '.avi', '.mov', '.exe', '.apk',
+    '.css', '.js', '.json', '.xml', '.woff', '.woff2',
+)
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter shared by every request of a crawl.
+    Tokens refill at `rate` per second, up to `burst` tokens. The rate is
+    halved when the server pushes back and creeps back up to its initial
+    value (`max_rate`) as requests succeed.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.max_rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._slowed_at = float('-inf') # When the rate was last halved
+        self._restore_at = None # When the server said its rate limit resets
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """
+        Waits until a request may be sent and consumes one token.
+        Returns the send time, to be passed back to slow_down.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                if self._restore_at is not None and now >= self._restore_at:
+                    self.rate = self.max_rate
+                    self._restore_at = None
+
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return now
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Holds back all requests for the given number of seconds."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def slow_down(self, sent_at, restore_after=None):
+        """
+        Halves the request rate, down to MIN_RATE_LIMIT. Responses to requests
+        sent before the previous slow-down are ignored, so a burst of pushback
+        on requests that were already in flight only halves the rate once.
+        If restore_after is given, the full rate returns after that many seconds.
+        """
+        if sent_at < self._slowed_at:
+            return
+        self._slowed_at = time.monotonic()
+        self.rate = max(MIN_RATE_LIMIT, self.rate / 2)
+        if restore_after is not None:
+            self._restore_at = self._slowed_at + restore_after
+
+    def speed_up(self):
+        """Raises the request rate by RATE_RECOVERY_STEP, up to max_rate."""
+        self.rate = min(self.max_rate, self.rate + RATE_RECOVERY_STEP)
+
+# A crawled page as stored in the page cache. `etag` and `last_modified` are
+# sent back to the server to revalidate the entry once PAGE_CACHE_TTL expires.
+# `links` is a tuple, or None if the page was only crawled at the last depth
+# level, where its links were never needed (and so never extracted).
+CachedPage = namedtuple('CachedPage', ['fetched_at', 'etag', 'last_modified', 'whatsapp_codes', 'links'])
+
+NOT_MODIFIED = object() # Returned by fetch_page when the server answers 304
+
+@st.cache_resource
+def _page_cache():
+    """
+    Returns the (url -> CachedPage) LRU cache and its lock. Being a cached
+    resource, it survives Streamlit reruns, so re-crawling the same site
+    (e.g. after changing the depth) skips pages fetched recently.
+    """
+    return OrderedDict(), threading.Lock()
+
+def _get_cached_page(url):
+    cache, lock = _page_cache()
+    with lock:
+        page = cache.get(url)
+        if page is not None:
+            cache.move_to_end(url)
+        return page
+
+def _store_cached_page(url, page):
+    cache, lock = _page_cache()
+    with lock:
+        cache[url] = page
+        cache.move_to_end(url)
+        while len(cache) > PAGE_CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+
+class VisitedUrls:
+    """
+    Memory-efficient set of crawled URLs for deep crawls: a scalable Bloom
+    filter, plus an exact LRU of the most recent URLs so the hottest lookups
+    never depend on the filter. A false positive only means a page is skipped.
+    """
+
+    def __init__(self):
+        self._bloom = ScalableBloomFilter(initial_capacity=VISITED_BLOOM_CAPACITY, error_rate=VISITED_BLOOM_ERROR_RATE)
+        self._recent = OrderedDict()
+
+    def add(self, url):
+        self._bloom.add(url)
+        self._recent[url] = None
+        self._recent.move_to_end(url)
+        if len(self._recent) > VISITED_RECENT_SIZE:
+            self._recent.popitem(last=False)
 
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def __contains__(self, url):
+        if url in self._recent:
+            self._recent.move_to_end(url)
+            return True
+        return url in self._bloom
+
+class ThrottledStatus:
+    """
+    Wraps a Streamlit placeholder so that `info` progress messages are sent
+    to the browser at most once per UI_UPDATE_INTERVAL; the latest message is
+    kept until then. Every other call (warning, error, ...) passes through.
+    """
+
+    def __init__(self, placeholder):
+        self._placeholder = placeholder
+        self._pending = None
+        self._last_update = 0.0
+
+    def info(self, message):
+        self._pending = message
+        if time.monotonic() - self._last_update >= UI_UPDATE_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Renders the latest buffered message, if any."""
+        if self._pending is not None:
+            self._placeholder.info(self._pending)
+            self._pending = None
+            self._last_update = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self._placeholder, name)
+
+def _known_encoding(charset):
+    """Returns charset if Python can decode it, else 'utf-8' (no content sniffing)."""
+    if charset:
+        try:
+            codecs.lookup(charset)
+            return charset
+        except LookupError:
+            pass
+    return 'utf-8'
+
+def _rate_limit_reset_seconds(response):
+    """
+    Returns the seconds until X-RateLimit-Reset, or None if absent or not
+    numeric. Servers send it either as a delay or as a Unix timestamp.
+    """
+    try:
+        reset = float(response.headers.get('X-RateLimit-Reset'))
+    except (TypeError, ValueError):
+        return None
+    if reset > 1_000_000_000: # Unix timestamp
+        reset -= time.time()
+    return max(0.0, reset)
+
+def _retry_after_seconds(response):
+    """Returns the Retry-After delay in seconds, or None if absent or not numeric."""
+    try:
+        return max(0.0, float(response.headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return None
+
+@functools.lru_cache(maxsize=URL_CACHE_SIZE)
 def is_valid_url(url):
     """Checks if the URL is valid and has a scheme."""
     try:
@@ -20,6 +269,7 @@ def is_valid_url(url):
     except ValueError:
         return False
 
+@functools.lru_cache(maxsize=URL_CACHE_SIZE)
 def get_domain(url):
     """Extracts the domain from a URL."""
     try:
@@ -27,95 +277,257 @@ def get_domain(url):
     except Exception:
         return None
 
-def find_whatsapp_links(page_content):
-    """Extracts WhatsApp group links from HTML content using regex."""
-    # Regex for https://chat.whatsapp.com/INVITE_CODE
-    # Invite codes are typically alphanumeric, can include hyphens or underscores.
-    # Let's be a bit generous with the character set for the invite code.
-    pattern = r"https?://chat\.whatsapp\.com/([A-Za-z0-9\-_]+)"
-    return set(re.findall(pattern, page_content)) # Use set to store unique links
-
-def crawl_website(start_url, max_depth, progress_bar, status_text):
+@functools.lru_cache(maxsize=URLJOIN_CACHE_SIZE)
+def _urljoin(origin, href):
     """
-    Crawls a website starting from start_url up to max_depth,
-    extracting WhatsApp group links.
+    Memoized urljoin for hrefs that resolve the same on every page of a site
+    (root-relative or absolute), keyed by the site's scheme://netloc so that
+    navigation repeated on every page hits the cache.
     """
-    if not is_valid_url(start_url):
-        status_text.error(f"Invalid starting URL: {start_url}")
-        return set(), 0
+    return urljoin(origin, href)
 
-    start_domain = get_domain(start_url)
-    if not start_domain:
-        status_text.error(f"Could not determine domain for URL: {start_url}")
-        return set(), 0
+def find_whatsapp_links(page_content):
+    """Extracts WhatsApp group invite codes from raw HTML bytes using regex."""
+    return {code.decode('ascii') for code in _WA_RE.findall(page_content)} # Use set to store unique links
 
-    # Queue stores (url, current_depth)
-    queue = deque([(start_url, 0)])
-    visited_urls = set()
-    found_whatsapp_links = set()
-    pages_crawled = 0
+async def fetch_page(session, semaphore, bucket, connect_failures, start_domain, url, depth, status_text, cached_page=None):
+    """
+    Fetches a single page, returning (raw HTML bytes, encoding, ETag,
+    Last-Modified), or None if the response is not HTML.
+    Network errors are raised to the caller.
 
-    headers = {'User-Agent': USER_AGENT}
+    If cached_page is given, the request is made conditional on its validators
+    and NOT_MODIFIED is returned when the server answers 304.
 
-    processed_urls_in_session = 0 # For progress bar estimate
+    Rate-limit hints from the server (Retry-After, X-RateLimit-Remaining,
+    HTTP 429) slow down the shared TokenBucket for the rest of the crawl.
 
-    while queue:
-        current_url, current_depth = queue.popleft()
+    connect_failures counts, per host, the URLs in a row that could not be
+    connected to even after retrying; any response resets the count. Once
+    it reaches DEAD_HOST_THRESHOLD, the host is given up on: the check runs
+    after acquiring a semaphore slot, so every URL that has not started yet,
+    at this depth or a later one, fails immediately.
+    """
+    host = start_domain # The crawl never leaves it; avoids parsing (and caching) every URL
+
+    async with semaphore:
+        if connect_failures[host] >= DEAD_HOST_THRESHOLD:
+            raise aiohttp.ClientConnectionError(f"{host} could not be reached for {connect_failures[host]} pages in a row")
+
+        status_text.info(f"Crawling (Depth {depth}): {url}")
+        request_headers = {}
+        if cached_page is not None:
+            if cached_page.etag:
+                request_headers['If-None-Match'] = cached_page.etag
+            if cached_page.last_modified:
+                request_headers['If-Modified-Since'] = cached_page.last_modified
+
+        for attempt in range(MAX_RETRIES + 1):
+            sent_at = await bucket.acquire() # Be polite
+            try:
+                async with session.get(url, headers=request_headers) as response:
+                    connect_failures.pop(host, None) # The host is reachable
+                    retry_after = _retry_after_seconds(response)
+                    quota_exhausted = response.headers.get('X-RateLimit-Remaining') == '0'
+                    if quota_exhausted or response.status == 429:
+                        bucket.slow_down(sent_at, _rate_limit_reset_seconds(response))
+                    if response.status == 429:
+                        if attempt < MAX_RETRIES:
+                            if retry_after is None:
+                                retry_after = RATE_LIMIT_BACKOFF * (2 ** attempt)
+                            bucket.pause(retry_after)
+                            continue
+                    elif retry_after is not None:
+                        bucket.pause(retry_after)
+
+                    response.raise_for_status() # Raise ClientResponseError for bad responses (4XX or 5XX)
+                    if not quota_exhausted:
+                        bucket.speed_up()
+                    if response.status == 304:
+                        return NOT_MODIFIED
+
+                    # Ensure content type is HTML before downloading the body
+                    content_type = response.headers.get('content-type', '').lower()
+                    if 'text/html' not in content_type:
+                        status_text.warning(f"Skipping non-HTML content at {url} (type: {content_type})")
+                        response.close() # Drop the connection instead of draining the unread body
+                        return None
+
+                    logger.debug("Fetched %s (Content-Encoding: %s)", url, response.headers.get('Content-Encoding'))
+
+                    if (response.content_length or 0) > MAX_PAGE_BYTES:
+                        status_text.warning(f"Skipping oversized page at {url} ({response.content_length} bytes)")
+                        response.close()
+                        return None
+
+                    # The body is kept as bytes: both extractors run on the raw
+                    # bytes, and only matched hrefs are decoded with this encoding.
+                    encoding = _known_encoding(response.charset)
+                    chunks, size = [], 0
+                    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                        chunks.append(chunk)
+                        size += len(chunk)
+                        if size >= MAX_PAGE_BYTES:
+                            response.close() # Stop downloading the rest of an oversized page
+                            break
+                    body = b''.join(chunks)[:MAX_PAGE_BYTES]
+                    return body, encoding, response.headers.get('ETag'), response.headers.get('Last-Modified')
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == MAX_RETRIES:
+                    if isinstance(e, (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError)):
+                        connect_failures[host] += 1
+                    raise
+                await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt))
+
+async def fetch_and_parse(session, semaphore, bucket, connect_failures, start_domain, url, depth, status_text, want_links):
+    """
+    Returns the CachedPage for url, or None if it is not HTML. Links are only
+    extracted when want_links is set, i.e. when the page will be expanded.
+    Pages fetched less than PAGE_CACHE_TTL seconds ago are served from the
+    page cache without a request; older entries are revalidated.
+    """
+    cached_page = _get_cached_page(url)
+    if cached_page is not None and want_links and cached_page.links is None:
+        cached_page = None # The body is needed again, so a 304 would not help
+    if cached_page is not None and time.time() - cached_page.fetched_at < PAGE_CACHE_TTL:
+        return cached_page
+
+    result = await fetch_page(session, semaphore, bucket, connect_failures, start_domain, url, depth, status_text, cached_page)
+    if result is None:
+        return None
+    if result is NOT_MODIFIED:
+        if cached_page is None: # 304 to a request that was not conditional
+            status_text.warning(f"Skipping {url}: unexpected 304 Not Modified")
+            return None
+        page = cached_page._replace(fetched_at=time.time())
+    else:
+        body, encoding, etag, last_modified = result
+        page = CachedPage(
+            fetched_at=time.time(),
+            etag=etag,
+            last_modified=last_modified,
+            whatsapp_codes=find_whatsapp_links(body),
+            links=tuple(extract_next_hops(url, body, start_domain, encoding)) if want_links else None,
+        )
+    _store_cached_page(url, page)
+    return page
 
-        if current_url in visited_urls or current_depth > max_depth:
+async def fetch_many(session, semaphore, bucket, connect_failures, start_domain, urls, depth, status_text, want_links):
+    """
+    Fetches all URLs of one crawl depth concurrently.
+    Returns (url, result) pairs, where a failed fetch's result is its exception.
+    """
+    tasks = [fetch_and_parse(session, semaphore, bucket, connect_failures, start_domain, url, depth, status_text, want_links) for url in urls]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return zip(urls, results)
+
+def extract_next_hops(page_url, page_content, start_domain, encoding='utf-8'):
+    """Returns the set of crawlable links on a page that stay within start_domain."""
+    next_hops = set()
+    parsed_page = urlparse(page_url)
+    origin = f"{parsed_page.scheme}://{parsed_page.netloc}"
+    for match in _HREF_RE.finditer(page_content):
+        raw_href = match.group(1) or match.group(2) or match.group(3) or b''
+        href = raw_href.decode(encoding, 'ignore').strip()
+        # Cheap string checks first: most junk links never need to be parsed
+        if not href or href.startswith(_SKIPPED_HREF_PREFIXES):
             continue
-
-        visited_urls.add(current_url)
-        status_text.info(f"Crawling (Depth {current_depth}): {current_url}")
-        pages_crawled += 1
-        processed_urls_in_session +=1
-
-        # Update progress bar (estimate, as total pages unknown)
-        # This is a simple progress, you might want something more sophisticated
-        # if you have an estimate of total pages (which is hard without full crawl first)
-        if processed_urls_in_session % 5 == 0 or len(queue) == 0 : # Update progress less frequently
-             progress_bar.progress(min(1.0, processed_urls_in_session / (processed_urls_in_session + len(queue) +1e-6) ))
-
-
+        if href.startswith(('http://', 'https://', '//')) and start_domain not in href: # Absolute link to another site
+            continue
+        if '&' in href:
+            href = html.unescape(href) # e.g. &amp; inside attribute values
         try:
-            time.sleep(REQUEST_DELAY) # Be polite
-            response = requests.get(current_url, headers=headers, timeout=10)
-            response.raise_for_status() # Raise HTTPError for bad responses (4XX or 5XX)
+            if href.startswith(('http://', 'https://')) or (href[0] == '/' and not href.startswith('//')):
+                absolute_link = _urljoin(origin, href)
+            else:
+                absolute_link = urljoin(page_url, href) # Handles page-relative URLs
+            parsed_link = urlparse(absolute_link)
+        except ValueError: # e.g. a malformed IPv6 host
+            continue
 
-            # Ensure content type is HTML before parsing
-            content_type = response.headers.get('content-type', '').lower()
-            if 'text/html' not in content_type:
-                status_text.warning(f"Skipping non-HTML content at {current_url} (type: {content_type})")
-                continue
+        if parsed_link.scheme not in ('http', 'https') or parsed_link.netloc != start_domain:
+            continue
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+        # Clean up the link (remove fragment, etc.)
+        clean_link = parsed_link._replace(fragment="", query="").geturl()
+        if not clean_link.lower().endswith(_SKIPPED_EXTENSIONS):
+            next_hops.add(clean_link)
+    return next_hops
 
-            # 1. Extract WhatsApp links from the current page
-            page_whatsapp_links = find_whatsapp_links(response.text)
-            for link in page_whatsapp_links:
-                full_link = f"https://chat.whatsapp.com/{link}" # Reconstruct full link
-                found_whatsapp_links.add(full_link)
+async def crawl_website(start_url, max_depth, progress_bar, status_text):
+    """
+    Crawls a website starting from start_url up to max_depth,
+    extracting WhatsApp group links.
 
-            # 2. Find new links to crawl (if within depth and domain)
-            if current_depth < max_depth:
-                for link_tag in soup.find_all('a', href=True):
-                    href = link_tag['href']
-                    absolute_link = urljoin(current_url, href) # Handles relative URLs
+    Pages are crawled level by level: every URL at depth N is fetched
+    concurrently before the links found on them are expanded to depth N+1.
+    """
+    if not is_valid_url(start_url):
+        status_text.error(f"Invalid starting URL: {start_url}")
+        return set(), 0
 
-                    # Clean up the link (remove fragment, etc.)
-                    parsed_link = urlparse(absolute_link)
-                    clean_link = parsed_link._replace(fragment="", query="").geturl()
+    start_domain = get_domain(start_url)
+    if not start_domain:
+        status_text.error(f"Could not determine domain for URL: {start_url}")
+        return set(), 0
 
+    status_text = ThrottledStatus(status_text) # Pages can finish far faster than the UI can repaint
 
-                    if is_valid_url(clean_link) and get_domain(clean_link) == start_domain and clean_link not in visited_urls:
-                        queue.append((clean_link, current_depth + 1))
+    frontier = {start_url} # URLs to crawl at the current depth
+    visited_urls = VisitedUrls()
+    whatsapp_codes = set()
+    pages_crawled = 0
 
-        except requests.exceptions.RequestException as e:
-            status_text.warning(f"Failed to fetch {current_url}: {e}")
-        except Exception as e:
-            status_text.warning(f"Error processing {current_url}: {e}")
+    headers = {
+        'User-Agent': USER_AGENT,
+        'Accept': 'text/html,application/xhtml+xml;q=0.9', # Only HTML is worth downloading
+        'Accept-Encoding': ACCEPT_ENCODING,
+    }
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+    connect_failures = Counter() # Host -> URLs in a row that failed to connect
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    # The crawl never leaves start_domain, so a single bucket covers the host
+    bucket = TokenBucket(rate=RATE_LIMIT, burst=RATE_BURST)
+    # One pooled connector for the whole crawl so keep-alive connections
+    # (and their TLS sessions) are reused across pages of the same host.
+    connector = aiohttp.TCPConnector(limit=POOL_MAXSIZE, limit_per_host=POOL_MAXSIZE)
+
+    async with aiohttp.ClientSession(headers=headers, timeout=timeout, connector=connector) as session:
+        for current_depth in range(max_depth + 1):
+            visited_urls.update(frontier)
+            pages_crawled += len(frontier)
+
+            expand = current_depth < max_depth # Links on the last level are never followed
+            results = await fetch_many(session, semaphore, bucket, connect_failures, start_domain, list(frontier), current_depth, status_text, expand)
+            status_text.flush() # Before this level's warnings, so a stale progress line cannot replace them
+
+            next_frontier = set()
+            for current_url, result in results:
+                if isinstance(result, (aiohttp.ClientError, asyncio.TimeoutError)):
+                    status_text.warning(f"Failed to fetch {current_url}: {str(result) or type(result).__name__}") # Timeouts have no message
+                    continue
+                if isinstance(result, Exception):
+                    status_text.warning(f"Error processing {current_url}: {result}")
+                    continue
+                if result is None: # Non-HTML content, already reported
+                    continue
+
+                # 1. Collect WhatsApp invite codes from the current page
+                whatsapp_codes |= result.whatsapp_codes
+
+                # 2. Queue new links to crawl (if within depth; already restricted to the domain)
+                if expand:
+                    next_frontier.update(result.links)
+
+            # Progress is measured in completed depth levels, since the total page count is unknown
+            progress_bar.progress((current_depth + 1) / (max_depth + 1))
+
+            frontier = {url for url in next_frontier if url not in visited_urls}
+            if not frontier:
+                break
 
     progress_bar.progress(1.0) # Ensure progress bar completes
+    found_whatsapp_links = {WHATSAPP_INVITE_PREFIX + code for code in whatsapp_codes} # Reconstruct full links
     return found_whatsapp_links, pages_crawled
 
 # --- Streamlit App UI ---
@@ -160,13 +572,13 @@ if st.button("🚀 Start Crawling", type="primary"):
 
         with st.spinner("🔍 Crawling in progress... Please wait."):
             progress_bar = progress_bar_placeholder.progress(0)
-            found_links_set, pages_crawled = crawl_website(
+            found_links_set, pages_crawled = asyncio.run(crawl_website(
                 start_url_input,
                 depth_input,
                 progress_bar,
                 status_text_placeholder
-            )
-        st.session_state.found_links = sorted(list(found_links_set))
+            ))
+        st.session_state.found_links = sorted(found_links_set)
         st.session_state.pages_crawled_count = pages_crawled
         st.session_state.crawling_done = True
 
@@ -182,11 +594,11 @@ if st.session_state.crawling_done:
     st.subheader(f"📊 Results: {len(st.session_state.found_links)} links found from {st.session_state.pages_crawled_count} pages")
 
     if st.session_state.found_links:
-        df_links = pd.DataFrame(st.session_state.found_links, columns=["WhatsApp Group Link"])
+        df_links = pd.DataFrame({"WhatsApp Group Link": st.session_state.found_links})
         st.dataframe(df_links, use_container_width=True)
 
-        # CSV Export
-        csv_data = df_links.to_csv(index=False).encode('utf-8')
+        # CSV Export (a single column of URLs, which never need quoting)
+        csv_data = ("WhatsApp Group Link\n" + "\n".join(st.session_state.found_links) + "\n").encode('utf-8')
         st.download_button(
             label="📥 Download Links as CSV",
             data=csv_data,